@@ -1,7 +1,126 @@
-import gpxpy
-import matplotlib.pyplot as plt
-from shapely.geometry import Polygon
-from numpy import arctan2, cos, sin, sqrt, pi, append, diff, deg2rad
+import math
+from xml.etree.ElementTree import iterparse
+from numpy import arctan2, cos, sin, sqrt, pi, diff, where, empty_like, add, subtract, multiply, mod, array, \
+    concatenate, float64
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, the area is calculated with plain NumPy without it
+    njit = None
+
+
+def _half_angle_sin_squared(sin_x, cos_x):
+    """
+    Function to calculate sin(x/2)^2 from the sine and cosine of x, avoiding the loss of precision of
+    (1 - cos(x)) / 2 for small angles
+    :param sin_x: The sine of the angle
+    :param cos_x: The cosine of the angle
+    :return: The square of the sine of half the angle
+    """
+    if cos_x > 0:
+        return sin_x * sin_x / (2 * (1 + cos_x))
+    return (1 - cos_x) / 2
+
+
+if njit is not None:
+    _half_angle_sin_squared = njit(cache=True)(_half_angle_sin_squared)
+
+
+def _area_integral(sin_lats, cos_lats, sin_lons, cos_lons):
+    """
+    Function to evaluate the line integral used by GpxReader.calculate_area in a single loop, so that no
+    intermediate arrays are created for the colatitudes and azimuths
+    :param sin_lats: The sines of the latitudes of the closed polygon
+    :param cos_lats: The cosines of the latitudes of the closed polygon
+    :param sin_lons: The sines of the longitudes of the closed polygon
+    :param cos_lons: The cosines of the longitudes of the closed polygon
+    :return: The sum of the integrands along the polygon
+    """
+    total = 0.
+    prev_colat = 0.
+    prev_az = 0.
+    for i in range(sin_lats.shape[0]):
+        sin_lat = sin_lats[i]
+        cos_lat = cos_lats[i]
+        sin_lon = sin_lons[i]
+        cos_lon = cos_lons[i]
+
+        # Colatitude and azimuth relative to (0,0)
+        a = _half_angle_sin_squared(sin_lat, cos_lat) + cos_lat * _half_angle_sin_squared(sin_lon, cos_lon)
+        colat = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        az = math.atan2(cos_lat * sin_lon, sin_lat)
+
+        if i > 0:
+            daz = (az - prev_az + math.pi) % (2 * math.pi) - math.pi
+            total += (1 - math.cos((prev_colat + colat) / 2)) * daz
+
+        prev_colat = colat
+        prev_az = az
+
+    return total
+
+
+if njit is not None:
+    _area_integral = njit(cache=True, fastmath=True, nogil=True)(_area_integral)
+
+
+def _sincos_numpy(x, sin_x, cos_x):
+    """
+    Function to calculate the sine and cosine of an array of angles with NumPy
+    :param x: The angles in radians
+    :param sin_x: The array to store the sines in
+    :param cos_x: The array to store the cosines in, which may be x itself
+    """
+    sin(x, out=sin_x)
+    cos(x, out=cos_x)
+
+
+def _sincos_loop(x, sin_x, cos_x):
+    """
+    Function to calculate the sine and cosine of an array of angles together in a single loop, so that when it is
+    compiled with Numba the sine and cosine of each angle come from one sincos call
+    :param x: The angles in radians, as a contiguous array
+    :param sin_x: The contiguous array to store the sines in
+    :param cos_x: The contiguous array to store the cosines in, which may be x itself
+    """
+    flat_x = x.reshape(x.size)
+    flat_sin_x = sin_x.reshape(x.size)
+    flat_cos_x = cos_x.reshape(x.size)
+    for i in range(x.size):
+        angle = flat_x[i]  # Read before the cosine is written, in case it overwrites the angle
+        flat_sin_x[i] = math.sin(angle)
+        flat_cos_x[i] = math.cos(angle)
+
+
+if njit is not None:
+    _sincos = njit(cache=True, nogil=True)(_sincos_loop)
+else:  # Without Numba the loop would run in Python, so NumPy is used instead
+    _sincos = _sincos_numpy
+
+
+def _read_coordinates(fh):
+    """
+    Function to stream the track points of the first track segment in a gpx file, keeping only their
+    longitudes and latitudes rather than building the whole gpx document
+    :param fh: The open gpx file to be read
+    :return: The longitudes and latitudes of the points in degrees, as the rows of one contiguous array
+    :raises ValueError: If the gpx file has no track points, such as a file containing only a route
+    """
+    lons = []
+    lats = []
+    for _, element in iterparse(fh):
+        tag = element.tag.rpartition('}')[2]  # Remove the gpx namespace from the tag
+        if tag == 'trkpt':
+            lons.append(float(element.get('lon')))
+            lats.append(float(element.get('lat')))
+            element.clear()
+        elif tag == 'trkseg':  # Only the first segment of the first track is used
+            break
+
+    if not lons:
+        raise ValueError('No track points were found in the gpx file ' + str(fh.name))
+
+    return array([lons, lats], dtype=float64)
 
 
 class GpxReader:
@@ -18,22 +137,19 @@ class GpxReader:
         :param earth_radius: The radius of Earth in metres, which is used for calculations with latitudes
         and longitudes
         """
-        self.__gpx_data = []
-        self.__segment = []
-        self.__lon_lat_line = []
-        self.__lon_lat_mission = []
-        self.__lon_lat_polygon = []
-        self.__lon_polygon = []
-        self.__lat_polygon = []
+        self.__lon_lat_polygon = None
         self.__earth_radius = earth_radius
+        self.__sin_lat_polygon = None
+        self.__cos_lat_polygon = None
+        self.__sin_lon_polygon = None
+        self.__cos_lon_polygon = None
         self.__line = None
         self.__mission = None
-        self.__polygon = None
         self.__area = None
         self.__distance = None
         self.__av_deviation = None
         self.read_segments(gpx_dir)
-        self.create_polygons()
+        self.calculate_trigonometry()
         self.calculate_line_distance()
         self.calculate_area()
         self.calculate_av_deviation()
@@ -44,65 +160,60 @@ class GpxReader:
         and combined
         :param gpx_dir: The file directory for the gpx files to be read
         """
-        with open(gpx_dir[0]) as fh:  # Open the straight line gpx file
-            self.__gpx_data.append(gpxpy.parse(fh))
-
-        with open(gpx_dir[1]) as fh:  # Open the gpx file for the actual route taken
-            self.__gpx_data.append(gpxpy.parse(fh))
-
-        for i in range(0, 2):  # Append the segments to the gpx reader object
-            self.__segment.append(self.__gpx_data[i].tracks[0].segments[0])
-
-        for coords in self.__segment[0].points:  # Add the lat/long from the straight line
-            self.__lon_lat_line.append([coords.longitude, coords.latitude])
-            self.__lon_lat_polygon.append([coords.longitude, coords.latitude])
-
-        for coords in self.__segment[0].points[::-1]:  # Add the lat/long from the straight line in reverse order
-            # This helps to plot the graphs
-            self.__lon_lat_line.append([coords.longitude, coords.latitude])
-
-        for coords in self.__segment[1].points:  # Add the lat/long from the actual line
-            self.__lon_lat_mission.append([coords.longitude, coords.latitude])
+        with open(gpx_dir[0], 'rb') as fh:  # Open the straight line gpx file
+            self.__line = _read_coordinates(fh)
 
-        for coords in self.__segment[1].points[::-1]:  # Add the lat/long from the actual line in reverse order
-            # This helps to plot the graphs
-            self.__lon_lat_mission.append([coords.longitude, coords.latitude])
-            self.__lon_lat_polygon.append([coords.longitude, coords.latitude])
+        with open(gpx_dir[1], 'rb') as fh:  # Open the gpx file for the actual route taken
+            self.__mission = _read_coordinates(fh)
 
-        for coords in self.__segment[0].points[0:1]:  # Add the first lat/long from the straight line
-            # This will close the polygon
-            self.__lon_lat_polygon.append([coords.longitude, coords.latitude])
+        # Join the straight line to the actual line in reverse order, then add the first point of the straight
+        # line to close the polygon
+        # The long/lat are kept as the rows of a single array to help calculations later
+        self.__lon_lat_polygon = concatenate([self.__line, self.__mission[:, ::-1], self.__line[:, :1]], axis=1)
 
-        for ords in self.__lon_lat_polygon:  # Store the lat/long in new arrays
-            # This is used to help calculations later
-            self.__lon_polygon.append(ords[0])
-            self.__lat_polygon.append(ords[1])
-
-    def create_polygons(self):
+    def calculate_trigonometry(self):
         """
-        Function to create polygons for each of the lines individually and combined
+        Function to calculate the sines and cosines of the latitudes and longitudes of the polygon once,
+        so that they can be shared by the distance and area calculations
         """
-        self.__line = Polygon(self.__lon_lat_line)
-        self.__mission = Polygon(self.__lon_lat_mission)
-        self.__polygon = Polygon(self.__lon_lat_polygon)
+        # Convert all latitudes and longitudes from degrees to radians
+        # The rows of the contiguous array are processed together, and each row of the results is contiguous
+        lon_lat = multiply(self.__lon_lat_polygon, pi / 180)
+
+        # The radians are not needed afterwards, so their buffer is reused to store the cosines
+        sin_lon_lat = empty_like(lon_lat)
+        cos_lon_lat = lon_lat
+        _sincos(lon_lat, sin_lon_lat, cos_lon_lat)
+        self.__sin_lon_polygon, self.__sin_lat_polygon = sin_lon_lat
+        self.__cos_lon_polygon, self.__cos_lat_polygon = cos_lon_lat
 
     def calculate_line_distance(self):
         """
         Function to calculate the distance of the straight line using the haversine formula
+        :raises ValueError: If the straight line has no points
         """
-        # Positions of each end of the straight line
-        lat_1 = deg2rad(self.__segment[0].points[0].latitude)
-        lat_2 = deg2rad(self.__segment[0].points[-1].latitude)
-        lon_1 = deg2rad(self.__segment[0].points[0].longitude)
-        lon_2 = deg2rad(self.__segment[0].points[-1].longitude)
-
-        # Difference in the positions of latitude and longitude
-        dlon = lon_2 - lon_1
-        dlat = lat_2 - lat_1
+        # The ends of the straight line are read from the start of the polygon, so an empty line would
+        # silently pick up points from the actual line instead
+        if self.__line.shape[1] == 0:
+            raise ValueError('The straight line has no points')
+
+        # Positions of each end of the straight line, which are at the start of the polygon
+        end = self.__line.shape[1] - 1
+        sin_lat_1, sin_lat_2 = self.__sin_lat_polygon[0], self.__sin_lat_polygon[end]
+        cos_lat_1, cos_lat_2 = self.__cos_lat_polygon[0], self.__cos_lat_polygon[end]
+        sin_lon_1, sin_lon_2 = self.__sin_lon_polygon[0], self.__sin_lon_polygon[end]
+        cos_lon_1, cos_lon_2 = self.__cos_lon_polygon[0], self.__cos_lon_polygon[end]
+
+        # Sines and cosines of the difference in the positions of latitude and longitude
+        sin_dlat = sin_lat_2 * cos_lat_1 - cos_lat_2 * sin_lat_1
+        cos_dlat = cos_lat_2 * cos_lat_1 + sin_lat_2 * sin_lat_1
+        sin_dlon = sin_lon_2 * cos_lon_1 - cos_lon_2 * sin_lon_1
+        cos_dlon = cos_lon_2 * cos_lon_1 + sin_lon_2 * sin_lon_1
 
         # Haversine formula, assumes Earth to be a perfect sphere
-        a = sin(dlat / 2) ** 2 + cos(lat_1) * cos(lat_2) * sin(dlon / 2) ** 2
-        c = 2 * arctan2(sqrt(a), sqrt(1 - a))
+        a = _half_angle_sin_squared(sin_dlat, cos_dlat) + \
+            cos_lat_1 * cos_lat_2 * _half_angle_sin_squared(sin_dlon, cos_dlon)
+        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
         # Calculates the distance between the two end points of the straight line
         self.__distance = self.__earth_radius * c
@@ -114,35 +225,44 @@ class GpxReader:
         Code sourced from
         https://stackoverflow.com/questions/4681737/how-to-calculate-the-area-of-a-polygon-on-the-earths-surface-using-python
         """
-        # Convert all latitudes and longitudes from degrees to radians
-        lats = deg2rad(self.__lat_polygon)
-        lons = deg2rad(self.__lon_polygon)
-
-        # Close the polygon if it doesn't end at the same point as it started at
-        if lats[0] != lats[-1]:
-            lats.append(lats[0])
-            lons.append(lons[0])
-
-        # Colatitudes relative to (0,0)
-        a = sin(lats / 2) ** 2 + cos(lats) * sin(lons / 2) ** 2
-        colat = 2 * arctan2(sqrt(a), sqrt(1 - a))
-
-        # Azimuths relative to (0,0)
-        az = arctan2(cos(lats) * sin(lons), sin(lats)) % (2 * pi)
-
-        # Calculate diffs
-        # daz = diff(az) % (2*pi)
-        daz = diff(az)
-        daz = (daz + pi) % (2 * pi) - pi
-
-        deltas = diff(colat) / 2
-        colat = colat[0:-1] + deltas
-
-        # Perform integral
-        integrands = (1 - cos(colat)) * daz
-
-        # Integrate
-        area = abs(sum(integrands)) / (4 * pi)
+        # The polygon is already closed by read_segments
+        sin_lats = self.__sin_lat_polygon
+        cos_lats = self.__cos_lat_polygon
+        sin_lons = self.__sin_lon_polygon
+        cos_lons = self.__cos_lon_polygon
+
+        if njit is not None:
+            # The kernel returns a Python float, so it is converted to match the NumPy path
+            total = float64(_area_integral(sin_lats, cos_lats, sin_lons, cos_lons))
+        else:
+            # Colatitudes relative to (0,0), calculating sin(x/2)^2 as _half_angle_sin_squared does
+            # The latitude term needs no branch as cos(lat) is never negative, and abs() keeps the unused
+            # longitude branch from dividing by zero at a longitude of 180 degrees
+            sin_lons_half_squared = where(cos_lons > 0, sin_lons * sin_lons / (2 * (1 + abs(cos_lons))),
+                                          (1 - cos_lons) / 2)
+            a = sin_lats * sin_lats / (2 * (1 + cos_lats)) + cos_lats * sin_lons_half_squared
+            colat = 2 * arctan2(sqrt(a), sqrt(1 - a))
+
+            # Azimuths relative to (0,0)
+            # These are not wrapped into [0, 2*pi) since the diffs are wrapped into [-pi, pi) anyway
+            az = arctan2(cos_lats * sin_lons, sin_lats)
+
+            # Calculate diffs, wrapping them in place
+            daz = diff(az)
+            add(daz, pi, out=daz)
+            mod(daz, 2 * pi, out=daz)
+            subtract(daz, pi, out=daz)
+
+            deltas = diff(colat) / 2
+            colat = colat[0:-1] + deltas
+
+            # Perform integral
+            integrands = (1 - cos(colat)) * daz
+
+            # Integrate
+            total = integrands.sum()
+
+        area = abs(total) / (4 * pi)
 
         area = min(area, 1 - area)
 
@@ -159,8 +279,14 @@ class GpxReader:
         Function to plot the graphs of both lines side by side and of both lines combined
         :param graph_dir: The file directories where the graphs should be saved
         """
-        plt.plot(*self.__line.exterior.xy, label="Line")
-        plt.plot(*self.__mission.exterior.xy, label="Mission")
+        # Matplotlib is only imported when graphs are plotted, as it is slow to import and not needed otherwise
+        import matplotlib.pyplot as plt
+
+        # Each graph gets its own figure, which is closed afterwards so that graphs of other missions are not
+        # drawn onto it when the backend does not clear figures on show
+        plt.figure()
+        plt.plot(*self.__line, label="Line")
+        plt.plot(*self.__mission, label="Mission")
         plt.grid()
         plt.title('Track')
         plt.xlabel('Longitude')
@@ -168,8 +294,10 @@ class GpxReader:
         plt.legend()
         plt.savefig(graph_dir[0])
         plt.show()
+        plt.close()
 
-        plt.plot(*self.__polygon.exterior.xy, label="Joined Lines")
+        plt.figure()
+        plt.plot(*self.__lon_lat_polygon, label="Joined Lines")
         plt.grid()
         plt.title('Track')
         plt.xlabel('Longitude')
@@ -177,6 +305,7 @@ class GpxReader:
         plt.legend()
         plt.savefig(graph_dir[1])
         plt.show()
+        plt.close()
 
     def get_distance(self):
         """
@@ -1,17 +1,27 @@
+from concurrent.futures import ProcessPoolExecutor
 from GpxReader import GpxReader, print_statistics
 
 
 if __name__ == '__main__':
-    # Type in the complete file paths of the gpx files in quotes
+    # Type in the complete file paths of the gpx files in quotes, with the line first and the route taken second
     # Use .\\ for a relative path to the main.py
-    file_paths = ['.\\gpx\\test_line.gpx',
-                  '.\\gpx\\test_mission.gpx']
+    # Add more pairs of file paths to analyse several missions at once
+    file_pairs = [('.\\gpx\\test_line.gpx', '.\\gpx\\test_mission.gpx')]
 
-    # Type in the desired file names for the graphs in quotes, including the file format such as .svg or .eps
-    # If you dont want the graphs, you put a # at the beginning of lines 12, 13, and 16
-    graph_names = ['.\\figures\\lines.svg',
-                   '.\\figures\\area.svg']
+    # Type in the desired file names for the graphs of each mission in quotes, including the file format such as
+    # .svg or .eps
+    # If you dont want the graphs, you put a # at the beginning of line 26
+    graph_names = [('.\\figures\\lines.svg', '.\\figures\\area.svg')]
 
-    slm = GpxReader(file_paths)  # slm stands for straight line mission
-    slm.plotter(graph_names)  # Plots graphs using both the lines
-    print_statistics(slm)  # Outputs the line distance, area, and average deviation
+    # Every mission needs its own pair of graph names so that none of the missions are left out
+    if len(graph_names) != len(file_pairs):
+        raise ValueError('There are ' + str(len(file_pairs)) + ' pairs of gpx files but ' + str(len(graph_names)) +
+                         ' pairs of graph names')
+
+    # Each mission is independent, so they are read and analysed in parallel across the CPU cores
+    with ProcessPoolExecutor() as executor:
+        missions = list(executor.map(GpxReader, file_pairs))
+
+    for slm, graphs in zip(missions, graph_names):  # slm stands for straight line mission
+        slm.plotter(graphs)  # Plots graphs using both the lines
+        print_statistics(slm)  # Outputs the line distance, area, and average deviation